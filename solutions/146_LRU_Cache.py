@@ -17,6 +17,16 @@
 # tail of the doubly linked list to make the code a bit cleaner (no need for special
 # cases to handle adding or removing from either end of the list)
 
+import asyncio
+import functools
+import heapq
+import inspect
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+
+
 class Node:
     def __init__(self, key=None, value=None):
         self.key = key
@@ -25,14 +35,20 @@ class Node:
         self.next = None
 
 
-class LRUCache:
-    def __init__(self, capacity: int):
+class NodeList:
+    """doubly linked list with dummy head and tail nodes; new nodes are
+    pushed at the tail and popped from the head. This is used by
+    LRUCache and by the other eviction policies further below
+    """
+    def __init__(self):
         self.head = Node()
         self.tail = Node()
         self.head.next = self.tail
         self.tail.prev = self.head
-        self.nodes_dict = {}
-        self.remaining_capacity = capacity
+        self.size = 0
+
+    def __len__(self):
+        return self.size
 
     def _push(self, new_node):
         prev = self.tail.prev
@@ -40,6 +56,7 @@ class LRUCache:
         new_node.prev = prev
         new_node.next = self.tail
         self.tail.prev = new_node
+        self.size += 1
 
     def _pop(self):
         first = self.head.next
@@ -50,6 +67,7 @@ class LRUCache:
         second.prev = self.head
         first.prev = None
         first.next = None
+        self.size -= 1
         return first
 
     def _remove(self, node):
@@ -61,8 +79,16 @@ class LRUCache:
         next_node.prev = prev_node
         node.prev = None
         node.next = None
+        self.size -= 1
         return node
 
+
+class LRUCache(NodeList):
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.nodes_dict = {}
+        self.remaining_capacity = capacity
+
     def get(self, key: int) -> int:
         if key in self.nodes_dict:
             node = self._remove(self.nodes_dict[key])
@@ -92,3 +118,617 @@ class LRUCache:
 # obj = LRUCache(capacity)
 # param_1 = obj.get(key)
 # obj.put(key,value)
+
+
+# Thread safety: LRUCache above is not thread-safe, as get and put both relink nodes in the
+# doubly linked list, and two threads doing this at the same time can corrupt the list.
+# The simplest fix is a single lock around every call, but then all threads wait on the same
+# lock. Instead we can split the keys across several independent LRUCache segments (shards)
+# by hash, each with its own lock, so threads only contend when they hit the same shard.
+# Note that eviction is then LRU within each shard rather than across the whole cache.
+
+class ShardedLRUCache:
+    def __init__(self, capacity: int, num_shards: int = 16):
+        # no more shards than capacity, or some shards would have
+        # capacity 0 and never cache anything
+        num_shards = max(1, min(num_shards, capacity))
+        # spread the capacity over the shards as evenly as possible
+        self.shards = [LRUCache(capacity // num_shards + (i < capacity % num_shards))
+                       for i in range(num_shards)]
+        self.locks = [threading.Lock() for _ in range(num_shards)]
+        # counters are per shard, and only updated under the shard's lock
+        self.hits = [0] * num_shards
+        self.misses = [0] * num_shards
+        self.evictions = [0] * num_shards
+
+    def _shard(self, key):
+        return hash(key) % len(self.shards)
+
+    def get(self, key: int) -> int:
+        i = self._shard(key)
+        with self.locks[i]:
+            shard = self.shards[i]
+            if key in shard.nodes_dict:
+                self.hits[i] += 1
+            else:
+                self.misses[i] += 1
+            return shard.get(key)
+
+    def put(self, key: int, value: int) -> None:
+        i = self._shard(key)
+        with self.locks[i]:
+            shard = self.shards[i]
+            is_new = key not in shard.nodes_dict
+            size = len(shard.nodes_dict)
+            shard.put(key, value)
+            # a new key that doesn't grow a non-empty shard evicted an entry
+            if is_new and size and len(shard.nodes_dict) == size:
+                self.evictions[i] += 1
+
+    def __len__(self):
+        return sum(len(shard.nodes_dict) for shard in self.shards)
+
+    def stats(self):
+        """returns counts of hits, misses, evictions, and the current size
+        """
+        return {
+            'hits': sum(self.hits),
+            'misses': sum(self.misses),
+            'evictions': sum(self.evictions),
+            'size': len(self),
+        }
+
+
+# Compact version: every Node above is a full python object with its own __dict__, so for caches
+# with millions of entries most of the memory goes to object overhead. Instead we can preallocate
+# capacity+2 slots, and keep the prev/next pointers of the doubly linked list as slot numbers in
+# two integer arrays (slots 0 and 1 are the dummy head and tail), with keys and values in two
+# lists indexed by slot. The hashmap then maps key -> slot, and unused slots are kept in a free
+# list (an evicted entry's slot is immediately reused by the new entry).
+
+HEAD, TAIL = 0, 1
+
+
+class CompactLRUCache:
+    def __init__(self, capacity: int):
+        size = capacity + 2
+        self.prev = array('l', [HEAD]) * size
+        self.next = array('l', [TAIL]) * size
+        self.keys = [None] * size
+        self.values = [None] * size
+        self.slots_dict = {}
+        # popped from the end, so slot 2 is used first
+        self.free = array('l', range(size-1, 1, -1))
+
+    def _push(self, slot):
+        prev = self.prev[TAIL]
+        self.next[prev] = slot
+        self.prev[slot] = prev
+        self.next[slot] = TAIL
+        self.prev[TAIL] = slot
+
+    def _remove(self, slot):
+        prev_slot, next_slot = self.prev[slot], self.next[slot]
+        self.next[prev_slot] = next_slot
+        self.prev[next_slot] = prev_slot
+
+    def get(self, key: int) -> int:
+        slot = self.slots_dict.get(key)
+        if slot is None:
+            return -1
+        self._remove(slot)
+        self._push(slot)
+        return self.values[slot]
+
+    def put(self, key: int, value: int) -> None:
+        slot = self.slots_dict.get(key)
+        if slot is not None:
+            self.values[slot] = value
+            self._remove(slot)
+            self._push(slot)
+            return
+        if not self.free:
+            evicted = self.next[HEAD]
+            if evicted == TAIL: # capacity is 0
+                return
+            self._remove(evicted)
+            del self.slots_dict[self.keys[evicted]]
+            self.keys[evicted] = self.values[evicted] = None
+            self.free.append(evicted)
+        slot = self.free.pop()
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.slots_dict[key] = slot
+        self._push(slot)
+
+
+def benchmark(capacity=10**6, num_ops=10**6, seed=0):
+    """compares LRUCache against CompactLRUCache: memory when full, and
+    throughput of a random mix of gets and puts
+    """
+    import random
+    import time
+    import tracemalloc
+
+    rng = random.Random(seed)
+    ops = [(rng.random() < 0.5, rng.randrange(2 * capacity)) for _ in range(num_ops)]
+
+    for cls in [LRUCache, CompactLRUCache]:
+        tracemalloc.start()
+        cache = cls(capacity)
+        for key in range(capacity):
+            cache.put(key, key)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for is_get, key in ops:
+            if is_get:
+                cache.get(key)
+            else:
+                cache.put(key, key)
+        elapsed = time.perf_counter() - start
+        print(f'{cls.__name__:<16} memory {memory / 2**20:8.1f}MB  {num_ops / elapsed:12,.0f} ops/s')
+
+
+# Other eviction policies
+# LRU does badly on scan-heavy traffic: one long scan over keys that are never used again
+# pushes every hot key out of the cache. Below are a few well-known alternatives with the same
+# get/put interface, all built from the same NodeList as LRUCache:
+# * LFU: evict the least frequently used key (ties broken by LRU). To make this O(1) we keep
+#   one NodeList per frequency, and track the minimum frequency; a hit moves the node from
+#   the list for freq to the list for freq+1.
+# * 2Q: new keys go into a small FIFO (a1_in). Keys evicted from a1_in are remembered (keys
+#   only, a "ghost" FIFO a1_out); only a key that comes back while in a1_out is promoted to
+#   the main LRU (a_m). A scan only ever touches a1_in, so the hot set in a_m survives.
+# * ARC (adaptive replacement cache): two LRU lists, t1 (seen once recently) and t2 (seen at
+#   least twice), plus ghost lists b1 and b2 of keys recently evicted from each. A hit in a
+#   ghost list means that list was too small, so the target size p of t1 adapts to the
+#   traffic. See Megiddo and Modha, "ARC: A Self-Tuning, Low Overhead Replacement Cache".
+# * TinyLFU: an LRU cache with an admission filter. A count-min sketch estimates how often
+#   every key was accessed recently (counters are halved periodically to age them), and a
+#   new key is only admitted if it is more frequent than the key it would evict.
+# replay_trace replays a list of keys against each policy (a miss is followed by a put, like
+# a read-through cache) and reports hit ratio and ops/sec.
+
+
+class LFUCache:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.nodes_dict = {}
+        self.freq_lists = {}
+        self.min_freq = 0
+
+    def _touch(self, node):
+        """moves node from the list for its frequency to the next one
+        """
+        freq_list = self.freq_lists[node.freq]
+        freq_list._remove(node)
+        if not freq_list:
+            del self.freq_lists[node.freq]
+            if self.min_freq == node.freq:
+                self.min_freq += 1
+        node.freq += 1
+        self.freq_lists.setdefault(node.freq, NodeList())._push(node)
+
+    def get(self, key: int) -> int:
+        node = self.nodes_dict.get(key)
+        if node is None:
+            return -1
+        self._touch(node)
+        return node.value
+
+    def put(self, key: int, value: int) -> None:
+        if self.capacity <= 0:
+            return
+        node = self.nodes_dict.get(key)
+        if node is not None:
+            node.value = value
+            self._touch(node)
+            return
+        if len(self.nodes_dict) == self.capacity:
+            freq_list = self.freq_lists[self.min_freq]
+            evicted = freq_list._pop()
+            if not freq_list:
+                del self.freq_lists[self.min_freq]
+            del self.nodes_dict[evicted.key]
+        node = Node(key, value)
+        node.freq = 1
+        self.nodes_dict[key] = node
+        self.freq_lists.setdefault(1, NodeList())._push(node)
+        self.min_freq = 1
+
+
+class TwoQCache:
+    def __init__(self, capacity: int, in_ratio=0.25, out_ratio=0.5):
+        self.capacity = capacity
+        self.in_capacity = max(1, int(capacity * in_ratio))
+        self.out_capacity = max(1, int(capacity * out_ratio))
+        self.a1_in = NodeList()
+        self.a1_out = NodeList()
+        self.a_m = NodeList()
+        self.nodes_dict = {}  # resident keys (a1_in and a_m)
+        self.ghosts = {}      # keys in a1_out
+
+    def get(self, key: int) -> int:
+        node = self.nodes_dict.get(key)
+        if node is None:
+            return -1
+        # hits in a1_in don't move the key (it's a FIFO)
+        if node.owner is self.a_m:
+            self.a_m._remove(node)
+            self.a_m._push(node)
+        return node.value
+
+    def _reclaim(self):
+        if len(self.a1_in) > self.in_capacity or not self.a_m:
+            evicted = self.a1_in._pop()
+            del self.nodes_dict[evicted.key]
+            evicted.value = None
+            self.a1_out._push(evicted)
+            self.ghosts[evicted.key] = evicted
+            if len(self.a1_out) > self.out_capacity:
+                del self.ghosts[self.a1_out._pop().key]
+        else:
+            del self.nodes_dict[self.a_m._pop().key]
+
+    def put(self, key: int, value: int) -> None:
+        if self.capacity <= 0:
+            return
+        node = self.nodes_dict.get(key)
+        if node is not None:
+            node.value = value
+            if node.owner is self.a_m:
+                self.a_m._remove(node)
+                self.a_m._push(node)
+            return
+        if len(self.nodes_dict) >= self.capacity:
+            self._reclaim()
+        ghost = self.ghosts.pop(key, None)
+        if ghost is not None:
+            self.a1_out._remove(ghost)
+            target = self.a_m
+        else:
+            target = self.a1_in
+        node = Node(key, value)
+        node.owner = target
+        target._push(node)
+        self.nodes_dict[key] = node
+
+
+class ARCCache:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.p = 0  # target size of t1
+        self.t1, self.t2 = NodeList(), NodeList()
+        self.b1, self.b2 = NodeList(), NodeList()
+        self.nodes_dict = {}  # every key in any of the four lists
+
+    def _move(self, node, target):
+        node.owner._remove(node)
+        node.owner = target
+        target._push(node)
+
+    def _replace(self, in_b2):
+        """evicts the LRU key of t1 or t2 into the matching ghost list
+        """
+        if self.t1 and (len(self.t1) > self.p or (in_b2 and len(self.t1) == self.p)):
+            node, ghost_list = self.t1.head.next, self.b1
+        else:
+            node, ghost_list = self.t2.head.next, self.b2
+        node.value = None
+        self._move(node, ghost_list)
+
+    def _discard(self, node_list):
+        del self.nodes_dict[node_list._pop().key]
+
+    def get(self, key: int) -> int:
+        node = self.nodes_dict.get(key)
+        if node is None or node.owner is self.b1 or node.owner is self.b2:
+            return -1
+        self._move(node, self.t2)
+        return node.value
+
+    def put(self, key: int, value: int) -> None:
+        if self.capacity <= 0:
+            return
+        c = self.capacity
+        node = self.nodes_dict.get(key)
+        if node is not None:
+            if node.owner is self.b1:
+                self.p = min(c, self.p + max(len(self.b2) // len(self.b1), 1))
+                self._replace(False)
+            elif node.owner is self.b2:
+                self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+                self._replace(True)
+            node.value = value
+            self._move(node, self.t2)
+            return
+
+        t1_total = len(self.t1) + len(self.b1)
+        total = t1_total + len(self.t2) + len(self.b2)
+        if t1_total == c:
+            if len(self.t1) < c:
+                self._discard(self.b1)
+                self._replace(False)
+            else:
+                self._discard(self.t1)
+        elif total >= c:
+            if total == 2 * c:
+                self._discard(self.b2)
+            self._replace(False)
+        node = Node(key, value)
+        node.owner = self.t1
+        self.t1._push(node)
+        self.nodes_dict[key] = node
+
+
+class CountMinSketch:
+    """approximate access counts with small saturating counters (capped
+    at 15); after sample_size increments all counters are halved so old
+    popularity fades out
+    """
+    DEPTH = 4
+    MAX_COUNT = 15
+    HALVE = bytes(i >> 1 for i in range(256))
+    SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+
+    def __init__(self, width, sample_size):
+        self.width = 1 << max(width-1, 1).bit_length()
+        self.mask = self.width - 1
+        self.rows = [bytearray(self.width) for _ in range(self.DEPTH)]
+        self.sample_size = sample_size
+        self.additions = 0
+
+    def _indices(self, key):
+        # one multiplicative hash per row, using the high bits of the product
+        h = hash(key) & 0xFFFFFFFF
+        return [(h * seed >> 16) & self.mask for seed in self.SEEDS]
+
+    def increment(self, key):
+        for row, idx in zip(self.rows, self._indices(key)):
+            if row[idx] < self.MAX_COUNT:
+                row[idx] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.additions //= 2
+            self.rows = [bytearray(row.translate(self.HALVE)) for row in self.rows]
+
+    def estimate(self, key):
+        return min(row[idx] for row, idx in zip(self.rows, self._indices(key)))
+
+
+class TinyLFUCache(LRUCache):
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        # 8 counters per entry per row keeps collisions with one-off
+        # (e.g. scanned) keys low
+        self.sketch = CountMinSketch(8 * max(capacity, 16), 10 * max(capacity, 16))
+
+    def get(self, key: int) -> int:
+        self.sketch.increment(key)
+        return super().get(key)
+
+    def put(self, key: int, value: int) -> None:
+        if key not in self.nodes_dict and self.remaining_capacity == 0:
+            victim = self.head.next
+            if victim is self.tail:
+                return
+            # admission: only replace the LRU key if the new key is
+            # accessed more often
+            if self.sketch.estimate(key) <= self.sketch.estimate(victim.key):
+                return
+        super().put(key, value)
+
+
+POLICIES = {
+    'LRU': LRUCache,
+    'LFU': LFUCache,
+    '2Q': TwoQCache,
+    'ARC': ARCCache,
+    'TinyLFU': TinyLFUCache,
+}
+
+
+def replay_trace(trace, capacity, policies=POLICIES):
+    """replays the keys in trace against every policy; returns (and
+    prints) the hit ratio and ops/sec of each
+    """
+    import time
+
+    results = {}
+    for name, cls in policies.items():
+        cache = cls(capacity)
+        hits = 0
+        start = time.perf_counter()
+        for key in trace:
+            if cache.get(key) != -1:
+                hits += 1
+            else:
+                cache.put(key, key)
+        elapsed = time.perf_counter() - start
+        results[name] = (hits / max(len(trace), 1), len(trace) / elapsed)
+        print(f'{name:<8} hit ratio {results[name][0]:6.3f}  {results[name][1]:12,.0f} ops/s')
+    return results
+
+
+def scan_trace(num_ops=10**5, hot_keys=500, scan_length=5000, scan_every=10000, seed=0):
+    """hot keys accessed with a skewed distribution, interrupted by long
+    scans over keys that are never used again
+    """
+    import random
+
+    rng = random.Random(seed)
+    trace = []
+    next_scan_key = hot_keys
+    while len(trace) < num_ops:
+        if len(trace) % scan_every == scan_every - 1:
+            trace.extend(range(next_scan_key, next_scan_key + scan_length))
+            next_scan_key += scan_length
+        else:
+            trace.append(int(hot_keys * rng.random() ** 2))
+    return trace[:num_ops]
+
+
+# Weights and expiry: LRUCache counts capacity in entries, which doesn't work well when values
+# range from bytes to megabytes. ExpiringLRUCache instead counts capacity in total weight (every
+# put has a weight, 1 by default), and evicts from the LRU end until the total fits.
+# Entries can also be given a ttl (time to live). Expiry is lazy: nothing runs in the background,
+# instead every get/put first pops the entries that have expired from a heap ordered by expiry
+# time, so expired entries are reclaimed without scanning the whole cache. Heap entries are not
+# removed when a key is updated or evicted; they are recognized as stale when popped (the node
+# they point to is no longer the one stored for that key).
+
+class ExpiringLRUCache(LRUCache):
+    def __init__(self, capacity: int, clock=time.monotonic):
+        super().__init__(capacity)
+        self.capacity = capacity
+        self.clock = clock
+        self.expiry_heap = []
+        self.counter = 0  # tie breaker for the heap
+
+    def _unlink(self, node):
+        self._remove(node)
+        del self.nodes_dict[node.key]
+        self.remaining_capacity += node.weight
+
+    def _expire(self):
+        now = self.clock()
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, node = heapq.heappop(heap)
+            if self.nodes_dict.get(node.key) is node and node.expires_at == expires_at:
+                self._unlink(node)
+        # too many stale entries: rebuild the heap from live entries
+        if len(heap) > 2 * len(self.nodes_dict) + 64:
+            heap[:] = [entry for entry in heap
+                       if self.nodes_dict.get(entry[2].key) is entry[2] and entry[2].expires_at == entry[0]]
+            heapq.heapify(heap)
+
+    def get(self, key: int) -> int:
+        self._expire()
+        return super().get(key)
+
+    def put(self, key: int, value: int, weight=1, ttl=None) -> None:
+        self._expire()
+        if key in self.nodes_dict:
+            self._unlink(self.nodes_dict[key])
+        if weight > self.capacity:
+            return
+        node = Node(key, value)
+        node.weight = weight
+        node.expires_at = None
+        if ttl is not None:
+            node.expires_at = self.clock() + ttl
+            self.counter += 1
+            heapq.heappush(self.expiry_heap, (node.expires_at, self.counter, node))
+        self.nodes_dict[key] = node
+        self._push(node)
+        self.remaining_capacity -= weight
+        while self.remaining_capacity < 0:
+            self._unlink(self.head.next)
+
+
+# Memoization: a decorator that caches results of a function in an LRUCache, keyed by the
+# arguments. When several callers miss on the same key at the same time, we don't want each of
+# them to compute the same value, so the first caller registers an in-flight future for the key
+# and the others wait on it (request coalescing). For async functions the in-flight future is an
+# asyncio task (awaited through asyncio.shield, so a cancelled caller doesn't cancel it for the
+# others); for regular functions it's a concurrent.futures.Future and a lock guards the cache.
+# Exceptions are passed on to every waiting caller, and are not cached.
+
+def lru_memoize(capacity=128):
+    def decorator(func):
+        cache = LRUCache(capacity)
+        in_flight = {}
+        stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+        lock = threading.Lock()
+
+        def make_key(args, kwargs):
+            return (args, tuple(sorted(kwargs.items()))) if kwargs else args
+
+        def lookup(key):
+            """returns (True, value) on a hit; must be called with lock held
+            """
+            if key in cache.nodes_dict:
+                stats['hits'] += 1
+                return True, cache.get(key)
+            return False, None
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                with lock:
+                    hit, value = lookup(key)
+                    if hit:
+                        return value
+                    task = in_flight.get(key)
+                    if task is not None:
+                        stats['coalesced'] += 1
+                    else:
+                        stats['misses'] += 1
+                        task = asyncio.ensure_future(func(*args, **kwargs))
+                        in_flight[key] = task
+                        task.add_done_callback(functools.partial(store, key))
+                return await asyncio.shield(task)
+
+            def store(key, task):
+                with lock:
+                    del in_flight[key]
+                    if not task.cancelled() and task.exception() is None:
+                        cache.put(key, task.result())
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                owner = False
+                with lock:
+                    hit, value = lookup(key)
+                    if hit:
+                        return value
+                    future = in_flight.get(key)
+                    if future is not None:
+                        stats['coalesced'] += 1
+                    else:
+                        stats['misses'] += 1
+                        future = in_flight[key] = Future()
+                        owner = True
+                if not owner:
+                    return future.result()
+                try:
+                    value = func(*args, **kwargs)
+                except BaseException as e:
+                    with lock:
+                        del in_flight[key]
+                    future.set_exception(e)
+                    raise
+                with lock:
+                    del in_flight[key]
+                    cache.put(key, value)
+                future.set_result(value)
+                return value
+
+        def cache_stats():
+            with lock:
+                return dict(stats, size=len(cache.nodes_dict), in_flight=len(in_flight))
+
+        def cache_clear():
+            """empties the cache and resets the counters, like
+            functools.lru_cache (calls in flight still finish)
+            """
+            nonlocal cache
+            with lock:
+                cache = LRUCache(capacity)
+                for name in stats:
+                    stats[name] = 0
+
+        wrapper.cache_stats = cache_stats
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+if __name__ == '__main__':
+    benchmark()
+    replay_trace(scan_trace(), capacity=400)
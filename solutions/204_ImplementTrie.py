@@ -11,35 +11,67 @@
 # When we add the word apples to the above dictionary, we get:
 # {'a':{'p':{'p':{'l':{'e':{'':'', 's':{'':''}}}}}}}
 
+# The first version of this implemented insert, search and startsWith with recursive helper
+# functions that passed suffix[1:] down. Slicing copies the suffix at every level, which makes
+# these O(L^2) for a word of length L, and long keys (URLs, file paths) hit the recursion limit.
+# Below they are simple loops instead.
+# For building a big trie at once, if the keys are sorted, consecutive keys share their longest
+# common prefix, so we can keep the path of dicts of the previous key on a stack and only
+# create the dicts after the common prefix (insert_sorted): one linear pass over the keys.
+
 class Trie:
     def __init__(self):
         self.data = {}
 
     def insert(self, word: str) -> None:
-        self._insertHelper(word, self.data)
+        current_dict = self.data
+        for char in word:
+            if char not in current_dict:
+                current_dict[char] = {}
+            current_dict = current_dict[char]
+        current_dict[''] = ''
 
-    def _insertHelper(self, suffix, current_dict):
-        if len(suffix) == 0:
-            current_dict[''] = ''
-        else:
-            if suffix[0] not in current_dict:
-                current_dict[suffix[0]] = {}
-            self._insertHelper(suffix[1:], current_dict[suffix[0]])
+    def _find(self, prefix):
+        """returns the dict for prefix, or None if no word starts with prefix
+        """
+        current_dict = self.data
+        for char in prefix:
+            current_dict = current_dict.get(char)
+            if current_dict is None:
+                return
+        return current_dict
 
     def search(self, word: str) -> bool:
-        return self._searchHelper(word, self.data)
-        
-    def _searchHelper(self, word, current_dict):
-        if len(word) == 0:
-            return '' in current_dict
-        else:
-            return word[0] in current_dict and self._searchHelper(word[1:], current_dict[word[0]])
+        current_dict = self._find(word)
+        return current_dict is not None and '' in current_dict
 
     def startsWith(self, prefix: str) -> bool:
-        return self._startsWithHelper(prefix, self.data)
-        
-    def _startsWithHelper(self, prefix, current_dict):
-        if len(prefix) == 0:
-            return True
-        else:
-            return prefix[0] in current_dict and self._startsWithHelper(prefix[1:], current_dict[prefix[0]])
+        return self._find(prefix) is not None
+
+    def insert_many(self, words):
+        for word in words:
+            self.insert(word)
+
+    def search_many(self, words):
+        return [self.search(word) for word in words]
+
+    def insert_sorted(self, words):
+        """inserts words, which must be sorted, in one pass
+        """
+        # path[i] is the dict for the first i chars of the previous word
+        path = [self.data]
+        previous = ''
+        for word in words:
+            common = 0
+            max_common = min(len(word), len(previous), len(path)-1)
+            while common < max_common and word[common] == previous[common]:
+                common += 1
+            del path[common+1:]
+            current_dict = path[-1]
+            for char in word[common:]:
+                if char not in current_dict:
+                    current_dict[char] = {}
+                current_dict = current_dict[char]
+                path.append(current_dict)
+            current_dict[''] = ''
+            previous = word
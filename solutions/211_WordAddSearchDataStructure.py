@@ -6,10 +6,37 @@
 
 # implementation details: root node and end of word nodes are simply TrieNode('')
 
+# second version: the first version (kept below as WordDictionary1) slices suffix[1:] at
+#           every step, and on '.' it builds the full list of results before calling any(),
+#           so it never stops early. Patterns like '......' end up visiting the whole trie.
+#           Improvements:
+#           1. search with an index into the pattern and an explicit stack, returning as soon
+#              as a match is found
+#           2. every node keeps a bitset of the lengths of words below it (bit d is set if
+#              some word ends exactly d characters below this node); a pattern with r
+#              characters left can only match below a node if bit r is set, which prunes
+#              most of the branches for wildcard-heavy patterns
+#           3. an LRU cache of search results for repeated patterns; adding a word can only
+#              turn a False into a True, so addWord only needs to drop the False results.
+#              True and False results are kept in two separate LRU dicts (each of up to
+#              CACHE_SIZE patterns), so addWord drops the False ones by replacing their dict
+#              instead of scanning the whole cache
+
+# bulk search: to match many patterns at once (search_many), the patterns themselves are put
+#           in a trie (PatternNode), and we walk the pattern trie and the word trie together,
+#           as pairs of (pattern node, word node). Patterns sharing a prefix share the pairs
+#           for that prefix, so the prefix is only explored once. Pairs are pruned when no
+#           pattern length below the pattern node matches a word length below the word node,
+#           and when every pattern below the pattern node has already been found.
+
+from collections import OrderedDict
+
+
 class TrieNode:
     def __init__(self, char=''):
         self.char = char
         self.children = {}
+        self.lengths = 0
     
     def add_child(self, child):
         """adds child node to current node
@@ -30,7 +57,7 @@ class TrieNode:
         return self.children.values()
 
 
-class WordDictionary:
+class WordDictionary1:
 
     def __init__(self):
         self.root = TrieNode('')
@@ -63,6 +90,171 @@ class WordDictionary:
             return False
 
 
+class PatternNode:
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.children = {}
+        self.ends = []       # indices of patterns ending here
+        self.lengths = 0     # same bitset as TrieNode.lengths
+        self.remaining = 0   # number of patterns below not found yet
+
+    def add_pattern(self, pattern, idx):
+        current = self
+        n = len(pattern)
+        for i, char in enumerate(pattern):
+            current.lengths |= 1 << (n - i)
+            current.remaining += 1
+            if char not in current.children:
+                current.children[char] = PatternNode(current)
+            current = current.children[char]
+        current.lengths |= 1
+        current.remaining += 1
+        current.ends.append(idx)
+
+    def resolve(self):
+        """marks the patterns ending here as found
+        """
+        current = self
+        while current:
+            current.remaining -= len(self.ends)
+            current = current.parent
+
+
+class WordDictionary:
+    CACHE_SIZE = 1024
+
+    def __init__(self):
+        self.root = TrieNode('')
+        self.hits = OrderedDict()    # patterns that matched
+        self.misses = OrderedDict()  # patterns that didn't match (yet)
+
+    def addWord(self, word: str) -> None:
+        current = self.root
+        n = len(word)
+        for i, char in enumerate(word):
+            current.lengths |= 1 << (n - i)
+            child = current.find_child(char)
+            if not child:
+                child = TrieNode(char)
+                current.add_child(child)
+            current = child
+        current.lengths |= 1
+        current.add_child(TrieNode(''))
+        if self.misses:
+            self.misses = OrderedDict()
+
+    def search(self, word: str) -> bool:
+        for cache, found in ((self.hits, True), (self.misses, False)):
+            if word in cache:
+                cache.move_to_end(word)
+                return found
+        found = self._search(word)
+        cache = self.hits if found else self.misses
+        cache[word] = None
+        if len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
+        return found
+
+    def _search(self, word):
+        n = len(word)
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            # no word below this node has exactly n - i characters left
+            if not (node.lengths >> (n - i)) & 1:
+                continue
+            if i == n:
+                return True
+            char = word[i]
+            if char == '.':
+                stack.extend((child, i+1) for child in node.get_all_children() if child.char)
+            else:
+                child = node.find_child(char)
+                if child:
+                    stack.append((child, i+1))
+        return False
+
+    def search_many(self, patterns, return_words=False):
+        """returns a list with the result of search for every pattern; if
+        return_words is set, returns for every pattern the list of words
+        it matches instead
+        """
+        pattern_root = PatternNode()
+        for idx, pattern in enumerate(patterns):
+            pattern_root.add_pattern(pattern, idx)
+        found = [False] * len(patterns)
+        matches = [[] for _ in patterns] if return_words else None
+
+        stack = [(pattern_root, self.root, '')]
+        while stack:
+            pattern_node, node, prefix = stack.pop()
+            if not pattern_node.lengths & node.lengths:
+                continue
+            if not return_words and pattern_node.remaining == 0:
+                continue
+            if pattern_node.ends and node.lengths & 1:
+                if return_words:
+                    for idx in pattern_node.ends:
+                        matches[idx].append(prefix)
+                if not found[pattern_node.ends[0]]:
+                    for idx in pattern_node.ends:
+                        found[idx] = True
+                    pattern_node.resolve()
+            for char, pattern_child in pattern_node.children.items():
+                if char == '.':
+                    children = [child for child in node.get_all_children() if child.char]
+                else:
+                    child = node.find_child(char)
+                    children = [child] if child else []
+                for child in children:
+                    stack.append((pattern_child, child, prefix + child.char if return_words else ''))
+        return matches if return_words else found
+
+
+def benchmark(num_words=20000, num_queries=20000, seed=0):
+    """compares WordDictionary1 against WordDictionary (with and without
+    the cache) on wildcard-heavy patterns
+    """
+    import random
+    import time
+
+    rng = random.Random(seed)
+    alphabet = 'abcdefgh'
+    words = [''.join(rng.choices(alphabet, k=rng.randint(3, 10))) for _ in range(num_words)]
+    queries = []
+    for _ in range(num_queries):
+        query = list(rng.choice(words) if rng.random() < 0.5 else
+                     ''.join(rng.choices(alphabet, k=rng.randint(3, 12))))
+        for i in range(len(query)):
+            if rng.random() < 0.6:
+                query[i] = '.'
+        queries.append(''.join(query))
+
+    for name, cls, cache_size in [('WordDictionary1', WordDictionary1, None),
+                                  ('WordDictionary (no cache)', WordDictionary, 0),
+                                  ('WordDictionary', WordDictionary, 1024)]:
+        dictionary = cls()
+        if cache_size is not None:
+            dictionary.CACHE_SIZE = cache_size
+        for word in words:
+            dictionary.addWord(word)
+        start = time.perf_counter()
+        for query in queries:
+            dictionary.search(query)
+        elapsed = time.perf_counter() - start
+        print(f'{name:<26} {num_queries / elapsed:12,.0f} queries/s')
+
+    dictionary.CACHE_SIZE = 0
+    start = time.perf_counter()
+    dictionary.search_many(queries)
+    elapsed = time.perf_counter() - start
+    print(f'{"WordDictionary.search_many":<26} {num_queries / elapsed:12,.0f} queries/s')
+
+
+if __name__ == '__main__':
+    benchmark()
+
+
 # Your WordDictionary object will be instantiated and called as such:
 # obj = WordDictionary()
 # obj.addWord(word)
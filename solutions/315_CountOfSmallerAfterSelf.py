@@ -166,6 +166,10 @@ class Solution2:
 # tree is replaced with a Fenwick tree (and the interface is slightly different,
 # as Fenwick tree naturally does prefix sums, and we don't have to specify the
 # left end of the range with index 0)
+# For very large inputs (millions of elements), see NumpyFenwickTree and
+# count_smaller_after in templates/RangeQuery.py, which do the queries and
+# updates for a whole block of indices (or all indices of the same value) in
+# lock-step with numpy.
 
 def get_lsd(n):
     """taken from stackoverflow
@@ -187,19 +191,23 @@ class FenwickTree:
         self.tree = [0] * length
     
     def add_val(self, i, val):
+        # get_next_higher inlined: idx & -idx is the least significant bit
+        tree, n = self.tree, len(self.tree)
         idx = i+1
-        while idx <= len(self.tree):
-            self.tree[idx-1] += val
-            idx = get_next_higher(idx)
+        while idx <= n:
+            tree[idx-1] += val
+            idx += idx & -idx
         
     def rangesum(self, i, j):
         return self.cumsum(j) - self.cumsum(i)
 
     def cumsum(self, i):
+        # get_next_lower inlined: i & (i-1) clears the least significant bit
+        tree = self.tree
         out = 0
         while i != 0:
-            out += self.tree[i-1]
-            i = get_next_lower(i)
+            out += tree[i-1]
+            i &= i - 1
         return out
 
 
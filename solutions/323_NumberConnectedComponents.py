@@ -5,12 +5,25 @@
 #           and path compression), the runtime of this algorithm is O(Nlog*(N)), where log* is the
 #           inverse Ackermann function, and for all practical purposes we can treat it as a constant
 
+import mmap
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# find is iterative with path halving (every node on the way up is pointed at its grandparent)
+# rather than recursive path compression, so long chains don't hit the recursion limit
+
 def find(parent, i):
-    if parent[i] == i:
-        return i
-    else:
-        parent[i] = find(parent, parent[i])
-        return parent[i]
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
 
 def union(parent, rank, leader1, leader2):
     if rank[leader1] > rank[leader2]:
@@ -31,4 +44,141 @@ class Solution:
             leader2 = find(parent, node2)
             if leader1 != leader2:
                 union(parent, rank, leader1, leader2)
-        return len([i for i in range(n) if parent[i] == i])
\ No newline at end of file
+        return len([i for i in range(n) if parent[i] == i])
+
+# Large graphs: when there are hundreds of millions of edges, a python list of lists doesn't fit
+# in memory, and a single process is slow. Instead the edges are stored in a binary file (pairs of
+# 64-bit ints, see write_edge_file), which every worker process maps into memory with mmap (so
+# nothing is copied or pickled), and each worker runs union find on its own slice of the edges.
+# A worker's result is a spanning forest of its slice: one (node, leader) pair for every node that
+# isn't its own leader, which is at most one pair per node no matter how many edges the slice had.
+# The main process then unions the forests of all slices, which gives the same components as
+# unioning all the edges. There is one slice per worker (so at most num_workers forests), and
+# every forest is merged as soon as it arrives, so only one is held at a time.
+# With numpy, both the workers and the merge use a vectorized union (union_pairs) over a parent
+# array of size n, reading the edges in blocks of BLOCK_EDGES; without it, the workers fall back to
+# a dict-based union find and the merge to find/union above.
+
+EDGE_SIZE = 16 # bytes per edge
+BLOCK_EDGES = 2**20
+
+
+def union_pairs(parent, node1, node2):
+    """vectorized union of every (node1[i], node2[i]) pair into parent (a
+    numpy array, modified in place): hook the larger root onto the smaller
+    one for all pairs at once, and compress with pointer jumping, until
+    every pair has the same root. On return every node points directly at
+    its root
+    """
+    while True:
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent[:] = grandparent
+        root1, root2 = parent[node1], parent[node2]
+        differ = root1 != root2
+        if not differ.any():
+            return
+        node1, node2 = node1[differ], node2[differ]
+        root1, root2 = root1[differ], root2[differ]
+        np.minimum.at(parent, np.maximum(root1, root2), np.minimum(root1, root2))
+
+
+def write_edge_file(path, edges, batch_size=2**16):
+    with open(path, 'wb') as f:
+        batch = array('q')
+        for node1, node2 in edges:
+            batch.append(node1)
+            batch.append(node2)
+            if len(batch) >= 2 * batch_size:
+                batch.tofile(f)
+                del batch[:]
+        batch.tofile(f)
+
+
+def chunk_forest(path, start, stop, n):
+    """union find over edges start...stop-1 of the edge file; returns the
+    spanning forest as bytes of (node, leader) int64 pairs
+    """
+    if np is not None:
+        edges = np.memmap(path, dtype=np.int64, mode='r').reshape(-1, 2)
+        parent = np.arange(n, dtype=np.int64)
+        for block in range(start, stop, BLOCK_EDGES):
+            pairs = np.array(edges[block:min(block + BLOCK_EDGES, stop)])
+            union_pairs(parent, pairs[:, 0], pairs[:, 1])
+        nodes = np.flatnonzero(parent != np.arange(n))
+        return np.column_stack((nodes, parent[nodes])).astype(np.int64).tobytes()
+
+    # parent is a dict, so a slice only pays for the nodes it touches
+    parent = {}
+
+    def find_dict(i):
+        while parent.get(i, i) != i:
+            parent[i] = parent.get(parent[i], parent[i])
+            i = parent[i]
+        return i
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        edges = memoryview(mapped)[start*EDGE_SIZE:stop*EDGE_SIZE].cast('q')
+        for k in range(0, len(edges), 2):
+            leader1 = find_dict(edges[k])
+            leader2 = find_dict(edges[k+1])
+            if leader1 != leader2:
+                parent[leader1] = leader2
+        edges.release()
+
+    forest = array('q')
+    for node in parent:
+        leader = find_dict(node)
+        if leader != node:
+            forest.append(node)
+            forest.append(leader)
+    return forest.tobytes()
+
+
+def count_components_file(n, path, num_workers=None):
+    num_edges = os.path.getsize(path) // EDGE_SIZE
+    # an empty file can't be mapped (and there is nothing to union)
+    if num_edges == 0:
+        return n
+    num_workers = num_workers or os.cpu_count()
+    # one chunk per worker, so there are as few forests to merge as possible
+    num_chunks = max(1, min(num_edges, num_workers))
+    bounds = [num_edges * i // num_chunks for i in range(num_chunks+1)]
+
+    if np is not None:
+        parent = np.arange(n, dtype=np.int64)
+    else:
+        parent = list(range(n))
+        rank = [0 for _ in parent]
+    components = n
+
+    def merge(forest):
+        nonlocal components
+        if np is not None:
+            pairs = np.frombuffer(forest, dtype=np.int64).reshape(-1, 2)
+            union_pairs(parent, pairs[:, 0], pairs[:, 1])
+            return
+        pairs = array('q')
+        pairs.frombytes(forest)
+        for k in range(0, len(pairs), 2):
+            leader1 = find(parent, pairs[k])
+            leader2 = find(parent, pairs[k+1])
+            if leader1 != leader2:
+                union(parent, rank, leader1, leader2)
+                components -= 1
+
+    if num_workers == 1:
+        for start, stop in zip(bounds, bounds[1:]):
+            merge(chunk_forest(path, start, stop, n))
+    else:
+        with ProcessPoolExecutor(num_workers) as pool:
+            # merged as they come in, so only one forest is held at a time
+            for forest in pool.map(chunk_forest, [path] * num_chunks, bounds[:-1], bounds[1:],
+                                   [n] * num_chunks):
+                merge(forest)
+
+    if np is not None:
+        return int(np.count_nonzero(parent == np.arange(n)))
+    return components
@@ -11,10 +11,10 @@
 # time: O(M*N)
 # space: O(M*N)
 
-class Solution:
+class Solution1:
     def minDistance(self, word1: str, word2: str) -> int:
         n, m = len(word1), len(word2)
-        def dp(i, j, memo={}):
+        def dp(i, j, memo):
             if (i, j) in memo:
                 return memo[(i, j)]
             if i == n:
@@ -32,3 +32,324 @@ class Solution:
             return out
 
         return dp(0, 0, {})
+
+
+# The memoized version above keeps all M*N entries and recurses M+N deep, so it dies on strings of a
+# few thousand characters. Row i of the table only depends on row i-1, so we can fill it
+# iteratively keeping two rows, with the shorter word along the row.
+# time: O(M*N)
+# space: O(min(M, N))
+
+def two_row_distance(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    cur = [0] * (len(b) + 1)
+    for i, char_a in enumerate(a, 1):
+        cur[0] = i
+        for j, char_b in enumerate(b, 1):
+            if char_a == char_b:
+                cur[j] = prev[j-1]
+            else:
+                cur[j] = 1 + min(prev[j-1], prev[j], cur[j-1])
+        prev, cur = cur, prev
+    return prev[-1]
+
+
+class Solution:
+    def minDistance(self, word1: str, word2: str) -> int:
+        return two_row_distance(word1, word2)
+
+
+# If we only care whether the distance is at most k (spell checking, dedup), we only need the
+# cells with |i-j| <= k: any path through a cell further from the diagonal already costs more
+# than k. Cells outside the band are treated as infinity, and we can stop as soon as a whole row
+# of the band is above k (the distances along a path never decrease).
+# Returns k+1 for anything above k.
+# time: O(k*N)
+# space: O(N) (the rows are allocated once, only the band is touched)
+
+def banded_distance(a, b, k):
+    if len(a) < len(b):
+        a, b = b, a
+    n, m = len(a), len(b)
+    if n - m > k:
+        return k + 1
+    inf = k + 1
+    prev = [j if j <= k else inf for j in range(m + 1)]
+    cur = [inf] * (m + 1)
+    for i in range(1, n + 1):
+        lo, hi = max(1, i - k), min(m, i + k)
+        cur[lo-1] = i if lo == 1 else inf
+        char_a = a[i-1]
+        row_min = cur[lo-1]
+        for j in range(lo, hi + 1):
+            if char_a == b[j-1]:
+                val = prev[j-1]
+            else:
+                val = 1 + min(prev[j-1], prev[j], cur[j-1])
+            cur[j] = val
+            if val < row_min:
+                row_min = val
+        if hi < m:
+            cur[hi+1] = inf
+        if row_min > k:
+            return inf
+        prev, cur = cur, prev
+    return min(prev[m], inf)
+
+
+# Myers' bit-parallel algorithm (in Hyyro's formulation for edit distance): adjacent cells of
+# the DP table differ by -1, 0 or +1, so a column can be stored as two bit vectors, Pv (the
+# vertical deltas that are +1) and Mv (the ones that are -1), and the next column is computed
+# from them with a handful of and/or/xor/add operations over the whole column at once. Python
+# ints are arbitrary precision, so the shorter word can be of any length and we do not need to
+# split it into 64 bit blocks ourselves.
+# We track the score of the last row (the distance between the whole pattern and the prefix of
+# the text read so far). It changes by at most 1 per column, so with a max_dist we can stop once
+# score - (characters left) > max_dist.
+# time: O(N * M/w) where w is the machine word size
+# space: O(M/w + alphabet)
+
+def myers_scores(pattern, text):
+    """yields D(pattern, text[:j]) for j = 1 ... len(text), i.e. the last
+    row of the table of pattern vs text (D(pattern, '') = len(pattern)
+    is not yielded)
+    """
+    m = len(pattern)
+    if m == 0:
+        yield from range(1, len(text) + 1)
+        return
+    peq = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv = full, 0
+    score = m
+    for char in text:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        yield score
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+
+
+def myers_distance(a, b, max_dist=None):
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a) if max_dist is None else min(len(a), max_dist + 1)
+    score = len(b)
+    remaining = len(a)
+    for score in myers_scores(b, a):
+        remaining -= 1
+        if max_dist is not None and score - remaining > max_dist:
+            return max_dist + 1
+    if max_dist is not None and score > max_dist:
+        return max_dist + 1
+    return score
+
+
+# The banded DP only beats the bit-parallel one when the band is narrow compared to the length of
+# the words: a DP cell costs a few python operations, while myers handles a whole column in ~15
+# int operations on M-bit ints. In benchmark() the crossover is around a band of M/256 cells.
+BAND_RATIO = 256
+
+
+def edit_distance(a, b, max_dist=None):
+    """levenshtein distance between a and b; with max_dist, anything above
+    max_dist is reported as max_dist + 1
+    """
+    if max_dist is not None:
+        if abs(len(a) - len(b)) > max_dist:
+            return max_dist + 1
+        if (2 * max_dist + 1) * BAND_RATIO <= min(len(a), len(b)):
+            return banded_distance(a, b, max_dist)
+    return myers_distance(a, b, max_dist)
+
+
+# Edit script
+# To get the operations, and not just the distance, the usual way is to keep the whole table and
+# walk back from the corner, which is O(M*N) memory. Hirschberg's divide and conquer gets it in
+# linear memory: cut a in half at mid, the optimal path crosses row mid at some column j, and
+#   distance = D(a[:mid], b[:j]) + D(a[mid:], b[j:])
+# The first term for every j is the last row of the table of a[:mid] vs b, the second is the last
+# row of the table of reversed(a[mid:]) vs reversed(b), so two row computations give j and we
+# recurse on the two halves. Small pieces are aligned with the full table.
+# The rows are computed bit-parallel with myers_scores, which yields D(a, b[:j]) for every j,
+# i.e. the last row of the table, so a row costs O(N * M/w) instead of O(M*N) python steps.
+# The halves at every level are independent, so with num_workers we split PARALLEL_LEVELS levels
+# in a process pool (all splits of a level at once) and then align the pieces in the pool.
+# time: O(M*N/w) per level, O(log M) levels
+# space: O(M+N)
+
+# pieces with at most this many cells are aligned with the full table
+BASE_CELLS = 4096
+PARALLEL_LEVELS = 3
+
+
+def _last_row(a, b):
+    """D(a, b[:j]) for j = 0 ... len(b)
+    """
+    row = [len(a)]
+    row.extend(myers_scores(a, b))
+    return row
+
+
+def _split(a, b):
+    """column where the optimal path of a vs b crosses row len(a)//2
+    """
+    mid = len(a) // 2
+    forward = _last_row(a[:mid], b)
+    backward = _last_row(a[mid:][::-1], b[::-1])
+    n = len(b)
+    return min(range(n + 1), key=lambda j: forward[j] + backward[n-j])
+
+
+def _align_table(a, b, i0, j0):
+    """alignment from the full table, for small pieces
+    """
+    n, m = len(a), len(b)
+    table = [list(range(m + 1))]
+    for i in range(1, n + 1):
+        prev, row = table[-1], [i]
+        for j in range(1, m + 1):
+            if a[i-1] == b[j-1]:
+                row.append(prev[j-1])
+            else:
+                row.append(1 + min(prev[j-1], prev[j], row[j-1]))
+        table.append(row)
+    out = []
+    i, j = n, m
+    while i or j:
+        if i and j and table[i][j] == table[i-1][j-1] + (a[i-1] != b[j-1]):
+            i, j = i - 1, j - 1
+            out.append(('match' if a[i] == b[j] else 'replace', i0 + i, j0 + j))
+        elif i and table[i][j] == table[i-1][j] + 1:
+            i -= 1
+            out.append(('delete', i0 + i, j0 + j))
+        else:
+            j -= 1
+            out.append(('insert', i0 + i, j0 + j))
+    out.reverse()
+    return out
+
+
+def _is_base(a, b):
+    return len(a) <= 1 or len(b) <= 1 or len(a) * len(b) <= BASE_CELLS
+
+
+def _align(a, b, i0=0, j0=0):
+    if _is_base(a, b):
+        return _align_table(a, b, i0, j0)
+    mid = len(a) // 2
+    j = _split(a, b)
+    return _align(a[:mid], b[:j], i0, j0) + _align(a[mid:], b[j:], i0 + mid, j0 + j)
+
+
+def _align_piece(piece):
+    return _align(*piece)
+
+
+def alignment(a, b, num_workers=None):
+    """optimal alignment of a and b as a list of (op, i, j), with op one
+    of 'match', 'replace' (a[i] -> b[j]), 'delete' (a[i], at position j
+    of b) and 'insert' (b[j], before a[i]); with num_workers > 1 the
+    recursion is spread over a process pool
+    """
+    if not num_workers or num_workers == 1:
+        return _align(a, b)
+    from concurrent.futures import ProcessPoolExecutor
+
+    # pieces as (a, b, i0, j0), sorted along the alignment
+    pieces = [(a, b, 0, 0)]
+    with ProcessPoolExecutor(num_workers) as pool:
+        for _ in range(PARALLEL_LEVELS):
+            to_split = [piece for piece in pieces if not _is_base(piece[0], piece[1])]
+            splits = dict(zip(map(id, to_split),
+                              pool.map(_split, *zip(*[piece[:2] for piece in to_split]))))
+            next_pieces = []
+            for piece in pieces:
+                if id(piece) not in splits:
+                    next_pieces.append(piece)
+                    continue
+                piece_a, piece_b, i0, j0 = piece
+                mid, j = len(piece_a) // 2, splits[id(piece)]
+                next_pieces.append((piece_a[:mid], piece_b[:j], i0, j0))
+                next_pieces.append((piece_a[mid:], piece_b[j:], i0 + mid, j0 + j))
+            pieces = next_pieces
+        out = []
+        for part in pool.map(_align_piece, pieces):
+            out.extend(part)
+    return out
+
+
+def edit_script(a, b, num_workers=None):
+    """the operations of an optimal alignment (see alignment()), without
+    the matches: len(edit_script(a, b)) == edit_distance(a, b)
+    """
+    return [op for op in alignment(a, b, num_workers) if op[0] != 'match']
+
+
+def benchmark(lengths=(100, 1000, 5000), max_dists=(2, 4, 8, 32), seed=0):
+    """compares the DPs and myers on random pairs of strings where the
+    second is the first with a few random edits
+    """
+    import random
+    import time
+
+    rng = random.Random(seed)
+    alphabet = 'acgt'
+
+    def mutate(word, edits):
+        word = list(word)
+        for _ in range(edits):
+            i = rng.randrange(len(word) + 1)
+            op = rng.randrange(3)
+            if op == 0 or not word or i == len(word):
+                word.insert(i, rng.choice(alphabet))
+            elif op == 1:
+                del word[i]
+            else:
+                word[i] = rng.choice(alphabet)
+        return ''.join(word)
+
+    def timed(func, *args):
+        start = time.perf_counter()
+        out = func(*args)
+        return out, time.perf_counter() - start
+
+    for length in lengths:
+        a = ''.join(rng.choices(alphabet, k=length))
+        b = mutate(a, max(1, length // 50))
+        expected, myers_time = timed(myers_distance, a, b)
+        line = f'length {length:>6} distance {expected:>4}: myers {myers_time*1000:9.2f}ms'
+        if length <= 1000:
+            out, elapsed = timed(two_row_distance, a, b)
+            assert out == expected
+            line += f'  two rows {elapsed*1000:9.2f}ms'
+        script, elapsed = timed(edit_script, a, b)
+        assert len(script) == expected
+        line += f'  edit_script {elapsed*1000:9.2f}ms'
+        print(line)
+        for max_dist in max_dists:
+            want = min(expected, max_dist + 1)
+            out1, banded_time = timed(banded_distance, a, b, max_dist)
+            out2, bounded_time = timed(myers_distance, a, b, max_dist)
+            assert out1 == out2 == want
+            print(f'    max_dist {max_dist:>4}: banded {banded_time*1000:9.2f}ms'
+                  f'  myers {bounded_time*1000:9.2f}ms')
+
+
+if __name__ == '__main__':
+    benchmark()
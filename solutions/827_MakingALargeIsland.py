@@ -13,8 +13,17 @@
 #                  for each location and area for each island id, and there are only 4 adjacent
 #                  locations to perform these lookups on).
 
+import heapq
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 class Solution:
     def largestIsland(self, grid: List[List[int]]) -> int:
         islands, areas = self.findAllIslands(grid)
@@ -89,4 +98,375 @@ class Solution:
             out.append((row, col-1))
         if col < n-1:
             out.append((row, col+1))
-        return out
\ No newline at end of file
+        return out
+
+# Incremental version: when the grid changes one cell at a time (cells only ever turn from 0
+# into 1), recomputing everything after every change is wasteful. IslandTracker keeps:
+#   1. union find over cells (cell id = row * cols + col), where the size of a leader is the
+#      area of its island; turning a cell into 1 unions it with its neighboring islands
+#   2. for every island, the set of 0 cells on its border (merged small into large on union)
+#   3. a max heap of (candidate area, cell) for 0 cells, where the candidate area of a 0 cell is
+#      1 + the areas of its distinct neighboring islands (same as calcLargest above)
+# Candidate areas never go down as cells are added, and only the 0 cells on the border of an
+# island that grew can change. So we mark grown islands as dirty, and before answering we push
+# fresh heap entries for their border cells; any heap entry whose area doesn't match the current
+# candidate area of its cell (or whose cell is now 1) is stale and is dropped when it comes up.
+# Everything is iterative, so large islands don't hit the recursion limit.
+
+class IslandTracker:
+    def __init__(self, grid: List[List[int]]):
+        self.rows, self.cols = len(grid), len(grid[0]) if grid else 0
+        num_cells = self.rows * self.cols
+        self.grid = bytearray(1 if grid[row][col] else 0
+                              for row in range(self.rows) for col in range(self.cols))
+        self.parent = list(range(num_cells))
+        self.size = [1] * num_cells
+        self.borders = {}
+        self.dirty = set()
+        self.heap = []
+        self.zero_count = num_cells - sum(self.grid)
+        self.max_area = 0
+
+        for cell in range(num_cells):
+            if self.grid[cell]:
+                self.max_area = max(self.max_area, 1)
+                for neighbor in self._neighbors(cell):
+                    if neighbor < cell and self.grid[neighbor]:
+                        self._union(cell, neighbor)
+        for cell in range(num_cells):
+            if not self.grid[cell]:
+                for neighbor in self._neighbors(cell):
+                    if self.grid[neighbor]:
+                        self.borders.setdefault(self._find(neighbor), set()).add(cell)
+        self._rebuild_heap()
+
+    def _neighbors(self, cell):
+        row, col = divmod(cell, self.cols)
+        if row > 0:
+            yield cell - self.cols
+        if row < self.rows - 1:
+            yield cell + self.cols
+        if col > 0:
+            yield cell - 1
+        if col < self.cols - 1:
+            yield cell + 1
+
+    def _find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, cell1, cell2):
+        """returns the leader of the merged island
+        """
+        leader1, leader2 = self._find(cell1), self._find(cell2)
+        if leader1 == leader2:
+            return leader1
+        if self.size[leader1] < self.size[leader2]:
+            leader1, leader2 = leader2, leader1
+        self.parent[leader2] = leader1
+        self.size[leader1] += self.size[leader2]
+        self.max_area = max(self.max_area, self.size[leader1])
+        border1 = self.borders.get(leader1, set())
+        border2 = self.borders.pop(leader2, set())
+        if len(border1) < len(border2):
+            border1, border2 = border2, border1
+        border1 |= border2
+        self.borders[leader1] = border1
+        return leader1
+
+    def _candidate(self, cell):
+        leaders = {self._find(neighbor) for neighbor in self._neighbors(cell) if self.grid[neighbor]}
+        return 1 + sum(self.size[leader] for leader in leaders)
+
+    def _rebuild_heap(self):
+        self.heap = [(-self._candidate(cell), cell) for cell in range(len(self.grid)) if not self.grid[cell]]
+        heapq.heapify(self.heap)
+        self.dirty.clear()
+
+    def set_cell(self, row, col, value=1):
+        """turns a cell into land; cells can't be turned back into water,
+        as union find can't split islands
+        """
+        cell = row * self.cols + col
+        if self.grid[cell]:
+            if not value:
+                raise ValueError('cannot remove land from an island')
+            return
+        if not value:
+            return
+        self.grid[cell] = 1
+        self.zero_count -= 1
+        self.max_area = max(self.max_area, 1)
+        leader = cell
+        self.borders[cell] = set()
+        for neighbor in self._neighbors(cell):
+            if self.grid[neighbor]:
+                leader = self._union(leader, neighbor)
+            else:
+                self.borders[self._find(leader)].add(neighbor)
+        leader = self._find(leader)
+        self.borders[leader].discard(cell)
+        self.dirty.add(leader)
+
+    def largest_island(self):
+        return self.max_area
+
+    def largest_with_flip(self):
+        """size of the largest island after changing at most one 0 into 1
+        """
+        if self.zero_count == 0:
+            return self.max_area
+        # too many stale entries, start over
+        if len(self.heap) > 4 * self.zero_count + 64:
+            self._rebuild_heap()
+        for leader in {self._find(leader) for leader in self.dirty}:
+            for cell in self.borders.get(leader, ()):
+                heapq.heappush(self.heap, (-self._candidate(cell), cell))
+        self.dirty.clear()
+        while True:
+            area, cell = self.heap[0]
+            if not self.grid[cell] and -area == self._candidate(cell):
+                return -area
+            heapq.heappop(self.heap)
+
+
+# Large grids: for a 10000 x 10000 grid, any per-cell python code is too slow (and a set of
+# (row, col) tuples, or a list of adjacent tuples per cell, takes gigabytes). With numpy:
+#   1. first pass: label horizontal runs of 1s in every row (a run starts at a 1 whose left
+#      neighbor is 0; a cumsum over run starts numbers them). Runs that touch vertically belong
+#      to the same island, which gives a list of (run, run) equivalences, one per overlap.
+#   2. resolve the equivalences with a vectorized union find over runs: hook the larger root
+#      onto the smaller root of every pair at once and compress with pointer jumping, repeating
+#      until every pair has the same root (same as UnionFind.union_many in templates/UnionFind.py).
+#   3. second pass: relabel every cell with the root of its run, and count areas with bincount.
+# The best flip is then computed in row blocks with shifted views of the label array: the gain of
+# a 0 cell is the area of the islands above, below, left and right, each counted once.
+# The grid can be given as 0/1 (or bool) array, or bit-packed along rows (np.packbits(grid,
+# axis=1)) with the number of columns, which is 8x smaller.
+# numpy is optional: the Solution above (and IslandTracker) work without it.
+
+def resolve_equivalences(parent, node1, node2):
+    """vectorized union of every (node1[i], node2[i]) pair: returns parent
+    with every node pointing directly at the smallest node of its component
+    """
+    while True:
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        if not len(node1):
+            return parent
+        root1, root2 = parent[node1], parent[node2]
+        differ = root1 != root2
+        node1, node2 = node1[differ], node2[differ]
+        root1, root2 = root1[differ], root2[differ]
+        np.minimum.at(parent, np.maximum(root1, root2), np.minimum(root1, root2))
+
+
+def best_flip(padded, areas, block_rows=1024):
+    """padded is an island label grid with a 1-cell border of 0s around
+    it, areas[label] is the area of the island; returns the largest
+    1 + (sum of distinct neighboring island areas) over all 0 cells
+    inside the border (0 if there are none)
+    """
+    best = 0
+    rows = padded.shape[0] - 2
+    for start in range(0, rows, block_rows):
+        stop = min(start + block_rows, rows)
+        center = padded[start+1:stop+1, 1:-1]
+        up = padded[start:stop, 1:-1]
+        down = padded[start+2:stop+2, 1:-1]
+        left = padded[start+1:stop+1, :-2]
+        right = padded[start+1:stop+1, 2:]
+        gain = (areas[up]
+                + areas[down] * (down != up)
+                + areas[left] * ((left != up) & (left != down))
+                + areas[right] * ((right != up) & (right != down) & (right != left)))
+        gain = gain[center == 0]
+        if len(gain):
+            best = max(best, 1 + int(gain.max()))
+    return best
+
+
+def label_islands(grid, cols=None):
+    """returns (labels, areas): labels[row, col] is the island id of a
+    cell (0 for water, 1...k for islands), and areas[i] the area of island
+    i (areas[0] = 0). If cols is given, grid is bit-packed along rows
+    """
+    if cols is not None:
+        land = np.unpackbits(np.asarray(grid, dtype=np.uint8), axis=1, count=cols).astype(bool)
+    else:
+        land = np.asarray(grid).astype(bool)
+    rows, cols = land.shape
+
+    starts = land.copy()
+    starts[:, 1:] &= ~land[:, :-1]
+    runs = np.cumsum(starts, dtype=np.int64).reshape(rows, cols)
+    num_runs = int(runs[-1, -1]) if land.size else 0
+    runs = np.where(land, runs, 0).astype(np.int32 if num_runs < 2**31 else np.int64)
+
+    # one equivalence per overlap of a run with a run above it: keep only
+    # the first cell of every stretch where both cells are land
+    touching = land[1:] & land[:-1]
+    first = touching.copy()
+    first[:, 1:] &= ~touching[:, :-1]
+    below, above = runs[1:][first].astype(np.int64), runs[:-1][first].astype(np.int64)
+
+    parent = resolve_equivalences(np.arange(num_runs + 1), below, above)
+    # number the roots 1...k (run 0 is water, its own root)
+    is_root = parent == np.arange(num_runs + 1)
+    island_ids = np.cumsum(is_root) - 1
+    labels = island_ids[parent].astype(runs.dtype)[runs]
+    areas = np.bincount(labels.ravel(), minlength=int(island_ids[-1]) + 1 if num_runs else 1)
+    areas[0] = 0
+    return labels, areas
+
+
+def largest_island_numpy(grid, cols=None, block_rows=1024):
+    labels, areas = label_islands(grid, cols)
+    rows, cols = labels.shape
+    if rows == 0 or cols == 0:
+        return 0
+    if not (labels == 0).any():
+        return rows * cols
+    return best_flip(np.pad(labels, 1), areas, block_rows)
+
+
+def benchmark(size=4000, densities=(0.05, 0.3, 0.6), seed=0):
+    """times largest_island_numpy on random grids of various densities
+    (the fraction of land), both as a 0/1 array and bit-packed
+    """
+    import time
+
+    rng = np.random.default_rng(seed)
+    for density in densities:
+        grid = (rng.random((size, size)) < density).astype(np.uint8)
+        packed = np.packbits(grid, axis=1)
+        for name, args in [('array', (grid,)), ('packed', (packed, size))]:
+            start = time.perf_counter()
+            result = largest_island_numpy(*args)
+            elapsed = time.perf_counter() - start
+            print(f'{size}x{size} density {density:4.2f} {name:<6} -> {result:10}  {elapsed:6.2f}s')
+
+
+# Grids larger than memory: the grid is stored as a file of uint8 0/1 values in row-major order,
+# and opened with np.memmap, so only the parts we touch are read. We cut it into tiles and:
+#   1. label every tile on its own (label_islands), in a process pool. Island i of a tile with
+#      offset o gets the global id o+i, so ids are unique across tiles. Every tile returns its
+#      island areas and the labels along its four edges (everything else is thrown away).
+#   2. in the main process, islands on two sides of a tile border that touch are the same island:
+#      union them (resolve_equivalences) and add up the areas per root.
+#   3. find the best flip in every tile, again in the process pool. The tile is relabeled (the
+#      labels come out the same as in step 1) and mapped to global roots, and the border cells of
+#      the neighboring tiles are added around it as a 1-cell halo, so cells at the tile edges see
+#      all four neighbors. The root and area lookup tables are passed to workers as .npy files
+#      opened with mmap rather than pickled.
+
+def tile_bounds(rows, cols, tile_size):
+    return [(r, min(r + tile_size, rows), c, min(c + tile_size, cols))
+            for r in range(0, rows, tile_size) for c in range(0, cols, tile_size)]
+
+
+def label_tile(path, shape, bounds):
+    r0, r1, c0, c1 = bounds
+    grid = np.memmap(path, dtype=np.uint8, mode='r', shape=shape)
+    labels, areas = label_islands(grid[r0:r1, c0:c1])
+    return areas, labels[0].copy(), labels[-1].copy(), labels[:, 0].copy(), labels[:, -1].copy()
+
+
+def tile_best_flip(path, shape, bounds, offset, halo, tables_dir):
+    r0, r1, c0, c1 = bounds
+    grid = np.memmap(path, dtype=np.uint8, mode='r', shape=shape)
+    root_of = np.load(os.path.join(tables_dir, 'root_of.npy'), mmap_mode='r')
+    root_area = np.load(os.path.join(tables_dir, 'root_area.npy'), mmap_mode='r')
+    labels, _ = label_islands(grid[r0:r1, c0:c1])
+    padded = np.zeros((r1 - r0 + 2, c1 - c0 + 2), dtype=np.int64)
+    padded[1:-1, 1:-1] = np.where(labels > 0, root_of[labels + offset], 0)
+    top, bottom, left, right = halo
+    padded[0, 1:-1], padded[-1, 1:-1] = top, bottom
+    padded[1:-1, 0], padded[1:-1, -1] = left, right
+    return best_flip(padded, root_area)
+
+
+def largest_island_tiled(path, shape, tile_size=2048, num_workers=None):
+    """largestIsland on a grid stored in a file of uint8 0/1 values of the
+    given (rows, cols) shape
+    """
+    rows, cols = shape
+    if rows == 0 or cols == 0:
+        return 0
+    tiles = tile_bounds(rows, cols, tile_size)
+    tiles_per_row = -(-cols // tile_size)
+    num_workers = num_workers or os.cpu_count()
+
+    def run(func, *args):
+        if num_workers == 1:
+            return list(map(func, *args))
+        with ProcessPoolExecutor(num_workers) as pool:
+            return list(pool.map(func, *args))
+
+    results = run(label_tile, [path] * len(tiles), [shape] * len(tiles), tiles)
+
+    # global ids: tile k's island i is offsets[k] + i
+    counts = [len(areas) - 1 for areas, *_ in results]
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    total = int(sum(counts))
+    areas = np.zeros(total + 1, dtype=np.int64)
+    for offset, (tile_areas, *_) in zip(offsets, results):
+        areas[offset+1:offset+len(tile_areas)] = tile_areas[1:]
+
+    def global_ids(k, local):
+        local = local.astype(np.int64)
+        return np.where(local > 0, local + offsets[k], 0)
+
+    # stitch: right edge of a tile with the left edge of the next one,
+    # bottom edge of a tile with the top edge of the one below it
+    pairs1, pairs2 = [], []
+    for k in range(len(tiles)):
+        _, _, bottom, _, right = results[k]
+        neighbors = []
+        if (k + 1) % tiles_per_row:
+            neighbors.append((right, results[k+1][3], k+1))
+        if k + tiles_per_row < len(tiles):
+            neighbors.append((bottom, results[k+tiles_per_row][1], k+tiles_per_row))
+        for edge, other_edge, other in neighbors:
+            both = (edge > 0) & (other_edge > 0)
+            pairs1.append(global_ids(k, edge[both]))
+            pairs2.append(global_ids(other, other_edge[both]))
+    pairs1 = np.concatenate(pairs1) if pairs1 else np.zeros(0, dtype=np.int64)
+    pairs2 = np.concatenate(pairs2) if pairs2 else np.zeros(0, dtype=np.int64)
+    root_of = resolve_equivalences(np.arange(total + 1), pairs1, pairs2)
+    root_area = np.bincount(root_of, weights=areas, minlength=total + 1).astype(np.int64)
+
+    if root_area.max(initial=0) == rows * cols:
+        return rows * cols
+
+    # halo of every tile: the edge of each neighbor tile facing it, as global roots
+    def edge(k, side, length):
+        if k is None:
+            return np.zeros(length, dtype=np.int64)
+        return root_of[global_ids(k, results[k][side])]
+
+    halos = []
+    for k, (r0, r1, c0, c1) in enumerate(tiles):
+        has_left, has_right = k % tiles_per_row > 0, (k + 1) % tiles_per_row > 0
+        above, below = k - tiles_per_row, k + tiles_per_row
+        halos.append((edge(above if above >= 0 else None, 2, c1 - c0),
+                      edge(below if below < len(tiles) else None, 1, c1 - c0),
+                      edge(k - 1 if has_left else None, 4, r1 - r0),
+                      edge(k + 1 if has_right else None, 3, r1 - r0)))
+
+    with tempfile.TemporaryDirectory() as tables_dir:
+        np.save(os.path.join(tables_dir, 'root_of.npy'), root_of)
+        np.save(os.path.join(tables_dir, 'root_area.npy'), root_area)
+        bests = run(tile_best_flip, [path] * len(tiles), [shape] * len(tiles), tiles,
+                    offsets, halos, [tables_dir] * len(tiles))
+    return max(bests)
+
+
+if __name__ == '__main__':
+    benchmark()
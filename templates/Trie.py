@@ -1,8 +1,79 @@
+import heapq
 import string
+from array import array
+from bisect import bisect_left
+from collections import deque
 
 
 ALPHABET = string.ascii_lowercase
 ALPHABET_SIZE = len(ALPHABET)
+# ALPHABET.index(char) is a linear scan, a dict lookup is O(1)
+CHAR_LOCS = {char: i for i, char in enumerate(ALPHABET)}
+# number of best completions cached at every node for top_k
+TOP_K_CACHE_SIZE = 10
+
+
+def _next_row(prev, char, word, depth, limit):
+    """one row of the edit distance table: prev is the row for a prefix
+    p of length depth-1 (distances between p and every prefix of word),
+    returns the row for p + char and its minimum. Only cells at most
+    limit away from the diagonal can be <= limit, the others are capped
+    at limit + 1 without being computed
+    """
+    cap = limit + 1
+    row = [cap] * (len(word) + 1)
+    low, high = max(0, depth - limit), min(len(word), depth + limit)
+    if low == 0:
+        left = row[0] = min(depth, cap)
+        low = 1
+    else:
+        left = cap
+    row_min = left
+    for j in range(low, high + 1):
+        val = prev[j-1] + (word[j-1] != char)
+        up = prev[j] + 1
+        if up < val:
+            val = up
+        if left + 1 < val:
+            val = left + 1
+        if val > cap:
+            val = cap
+        row[j] = left = val
+        if val < row_min:
+            row_min = val
+    return row, row_min
+
+
+def _fuzzy_walk(root, word, max_dist, top_n, children, is_end):
+    """walk shared by Trie and CompactTrie fuzzy_search; children(node)
+    gives (char, child) pairs and is_end(node) whether node ends a word
+    """
+    out = []
+    # with top_n, the n-th best distance so far (as a max heap of
+    # negated distances) is a tighter bound than max_dist
+    best = []
+    limit = max_dist
+    stack = [(root, '', [min(j, limit + 1) for j in range(len(word) + 1)])]
+    while stack:
+        node, prefix, row = stack.pop()
+        if is_end(node) and row[-1] <= limit:
+            out.append((row[-1], prefix))
+            if top_n is not None:
+                heapq.heappush(best, -row[-1])
+                if len(best) > top_n:
+                    heapq.heappop(best)
+                if len(best) == top_n:
+                    limit = -best[0]
+        depth = len(prefix) + 1
+        for char, child in children(node):
+            child_row, row_min = _next_row(row, char, word, depth, limit)
+            # distances never decrease going down, so if every cell of
+            # the row is above the limit no word below can make it
+            if row_min <= limit:
+                stack.append((child, prefix + char, child_row))
+    out.sort()
+    out = [(dist, w) for dist, w in out if dist <= limit]
+    return out if top_n is None else out[:top_n]
 
 
 class TrieNode:
@@ -21,25 +92,28 @@ class TrieNode:
 
 
 class Trie:
+    # subclasses with extra per-node data override this
+    _node_class = TrieNode
+
     def __init__(self, words=[]):
-        self.root = TrieNode() # root node
+        self.root = self._node_class() # root node
         for word in words:
             self.insert(word)
 
     def get_loc(self, char):
         # if alphabet is set to ascii_lowercase,
         # then ord(char) - ord('a') is faster
-        return ALPHABET.index(char)
+        return CHAR_LOCS[char]
 
     def insert(self, word):
         current = self.root
         for char in word:
             loc = self.get_loc(char)
             if not current.children[loc]:
-                current.children[loc] = TrieNode()
+                current.children[loc] = self._node_class()
             current = current.children[loc]
         current.end_of_word = True
-    
+
     def delete(self, word):
         """this only deletes if the exact word exists in the
         trie
@@ -78,9 +152,58 @@ class Trie:
     def search(self, prefix):
         """returns all words that start with prefix
         """
+        return list(self.iter_search(prefix))
+
+    def fuzzy_search(self, word, max_dist, top_n=None):
+        """returns (distance, word) for every word within edit distance
+        max_dist of word, sorted by distance then alphabetically (only
+        the top_n closest if given). Words sharing a prefix share the
+        rows of the DP table for it, so instead of one edit distance per
+        word we compute one row per trie edge, and a subtree is skipped
+        as soon as its row is entirely above max_dist
+        """
+        def children(node):
+            return [(ALPHABET[loc], child) for loc, child in enumerate(node.children) if child]
+        return _fuzzy_walk(self.root, word, max_dist, top_n, children,
+                           lambda node: node.end_of_word)
+
+    def iter_search(self, prefix, limit=None):
+        """yields words that start with prefix in alphabetical order,
+        stopping after limit words (if given). Instead of building lists
+        of suffixes for every subtree, this walks the trie with an explicit
+        stack of [node, next child location to visit], and the current
+        word as a list of chars, so the state is O(depth)
+        """
         node = self._find_node(prefix)
-        suffixes = self._get_suffixes(node)
-        return [prefix + suffix for suffix in suffixes]
+        if node is None or limit == 0:
+            return
+        count = 0
+        if node.end_of_word:
+            yield prefix
+            count += 1
+            if count == limit:
+                return
+        chars = list(prefix)
+        stack = [[node, 0]]
+        while stack:
+            top = stack[-1]
+            node, loc = top
+            while loc < ALPHABET_SIZE and not node.children[loc]:
+                loc += 1
+            if loc == ALPHABET_SIZE:
+                stack.pop()
+                if stack:
+                    chars.pop()
+                continue
+            top[1] = loc + 1
+            child = node.children[loc]
+            chars.append(ALPHABET[loc])
+            stack.append([child, 0])
+            if child.end_of_word:
+                yield ''.join(chars)
+                count += 1
+                if count == limit:
+                    return
         
     def _find_node(self, prefix):
         current = self.root
@@ -90,14 +213,269 @@ class Trie:
                 return
             current = current.children[loc]
         return current
-    
-    def _get_suffixes(self, node):
+
+
+# Autocomplete
+# For top_k, every node also keeps the weight of its word and a cached list of
+# the best TOP_K_CACHE_SIZE completions in its subtree. Keeping those lists up
+# to date roughly doubles the cost of insert and adds about 30% of memory, so
+# it lives in a subclass and plain Trie doesn't pay for it.
+
+class WeightedTrieNode(TrieNode):
+    def __init__(self):
+        super().__init__()
+        # weight of the word ending here (if end_of_word), and the
+        # best completions in this subtree as a sorted list of
+        # (-weight, word), at most TOP_K_CACHE_SIZE of them
+        self.weight = 0
+        self.top = []
+
+
+class WeightedTrie(Trie):
+    _node_class = WeightedTrieNode
+
+    def insert(self, word, weight=0):
+        """inserts word (or changes its weight if it already exists)
+        """
+        current = self.root
+        path = [current]
+        for char in word:
+            loc = self.get_loc(char)
+            if not current.children[loc]:
+                current.children[loc] = self._node_class()
+            current = current.children[loc]
+            path.append(current)
+        old_weight = current.weight if current.end_of_word else None
+        current.end_of_word = True
+        current.weight = weight
+
+        if old_weight is not None and weight < old_weight:
+            # the word moves down, so some other word may need to
+            # move up into the cached lists
+            self._refresh_top(word)
+            return
+        # the word moves up (or is new), so it simply needs to be
+        # inserted into the cached lists from the bottom up; if it
+        # doesn't make the cut at some node, it won't at any ancestor
+        entry = (-weight, word)
+        for node in reversed(path):
+            top = [e for e in node.top if e[1] != word]
+            top.append(entry)
+            top.sort()
+            if top[-1] is entry and len(top) > TOP_K_CACHE_SIZE:
+                break
+            node.top = top[:TOP_K_CACHE_SIZE]
+
+    def _refresh_top(self, word):
+        """recomputes the cached best completions of every node on the
+        path of word from the node's own word and its children's lists,
+        from the bottom up
+        """
+        path = [(self.root, '')]
+        for i, char in enumerate(word):
+            child = path[-1][0].children[self.get_loc(char)]
+            if not child:
+                break
+            path.append((child, word[:i+1]))
+        for node, prefix in reversed(path):
+            candidates = [(-node.weight, prefix)] if node.end_of_word else []
+            for child in node.children:
+                if child:
+                    candidates.extend(child.top)
+            node.top = heapq.nsmallest(TOP_K_CACHE_SIZE, candidates)
+
+    def top_k(self, prefix, k):
+        """returns the k words with the highest weights that start
+        with prefix (ties are broken alphabetically)
+        """
+        node = self._find_node(prefix)
+        if node is None:
+            return []
+        # the cached list is complete if it isn't full
+        if k <= TOP_K_CACHE_SIZE or len(node.top) < TOP_K_CACHE_SIZE:
+            return [word for _, word in node.top[:k]]
+        return self._best_first(node, prefix, k)
+
+    def _best_first(self, node, prefix, k):
+        """best-first walk for k larger than the cache: the heap holds
+        subtrees keyed by their best completion (top[0]) and words keyed
+        by their own weight, so words are popped in order of weight
+        """
         out = []
-        for i, child in enumerate(node.children):
-            if child:
-                char = ALPHABET[i]
-                out.extend([char + suffix for suffix in self._get_suffixes(child)])
-        if node.end_of_word:
-            out.append('')
+        counter = 0
+        heap = [(node.top[0], counter, prefix, node)]
+        while heap and len(out) < k:
+            _, _, prefix, node = heapq.heappop(heap)
+            if node is None:
+                out.append(prefix)
+                continue
+            if node.end_of_word:
+                counter += 1
+                heapq.heappush(heap, ((-node.weight, prefix), counter, prefix, None))
+            for loc, child in enumerate(node.children):
+                if child and child.top:
+                    counter += 1
+                    heapq.heappush(heap, (child.top[0], counter, prefix + ALPHABET[loc], child))
+        return out
+
+    def delete(self, word):
+        super().delete(word)
+        self._refresh_top(word)
+
+
+# Compact Trie
+# Trie above pre-allocates 26 slots per node, so with millions of words
+# most of the memory is spent on empty slots (and on python object
+# overhead). If the set of words doesn't change often, we can freeze it
+# into a few flat arrays instead (this is a CSR layout, as in sparse
+# matrices):
+# * nodes are numbered in BFS order, with children in alphabetical order,
+#   so the children of a node always have consecutive ids
+# * child_start[k] is the id of the first child of node k, and the
+#   children of node k are child_start[k] ... child_start[k+1]-1
+# * labels[k] is the (location of the) letter on the edge into node k,
+#   since children are sorted we can find a child by binary search
+# * end_of_word[k] is 1 if node k is the end of a word
+# This is about 6 bytes per node (1 for the label, 1 for end_of_word and 4
+# for child_start, which is array('I') and so limited to 2**32 nodes). The
+# price is that the structure is frozen: insert and delete need to rebuild
+# the arrays.
+
+# child_start holds node ids (and one past the last node) in 4 bytes
+MAX_COMPACT_NODES = 2**32 - 1
+
+
+class CompactTrie:
+    def __init__(self, words=[]):
+        self._build(sorted(set(words)))
+
+    @classmethod
+    def from_trie(cls, trie):
+        """freezes an existing (node based) Trie
+        """
+        return cls(trie.search(''))
+
+    def _build(self, words):
+        """words must be sorted and distinct; every node is a range of
+        words sharing a prefix, so we can build level by level without
+        ever creating TrieNode objects
+        """
+        self.labels = array('B', [0])
+        self.end_of_word = bytearray()
+        self.child_start = array('I')
+        queue = deque([(0, len(words), 0)])
+        while queue:
+            low, high, depth = queue.popleft()
+            if len(self.labels) > MAX_COMPACT_NODES:
+                raise ValueError(f'CompactTrie supports at most {MAX_COMPACT_NODES} nodes')
+            self.child_start.append(len(self.labels))
+            # the word equal to the prefix itself sorts first
+            is_end = low < high and len(words[low]) == depth
+            self.end_of_word.append(is_end)
+            if is_end:
+                low += 1
+            while low < high:
+                char = words[low][depth]
+                end = low + 1
+                while end < high and words[end][depth] == char:
+                    end += 1
+                self.labels.append(CHAR_LOCS[char])
+                queue.append((low, end, depth+1))
+                low = end
+        self.child_start.append(len(self.labels))
+
+    def __len__(self):
+        return sum(self.end_of_word)
+
+    def _find_node(self, prefix):
+        # children of node are labels[child_start[node]:child_start[node+1]]
+        # and are sorted, so each step is a binary search
+        labels, child_start = self.labels, self.child_start
+        node = 0
+        for char in prefix:
+            loc = CHAR_LOCS.get(char)
+            if loc is None:
+                return
+            high = child_start[node+1]
+            node = bisect_left(labels, loc, child_start[node], high)
+            if node == high or labels[node] != loc:
+                return
+        return node
+
+    def find(self, word):
+        node = self._find_node(word)
+        return node is not None and bool(self.end_of_word[node])
+
+    def search(self, prefix):
+        """returns all words that start with prefix, in alphabetical order
+        """
+        node = self._find_node(prefix)
+        if node is None:
+            return []
+        out = []
+        # explicit stack of (node, word so far); children are pushed in
+        # reverse so that they are popped in alphabetical order
+        stack = [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            if self.end_of_word[node]:
+                out.append(word)
+            for child in range(self.child_start[node+1]-1, self.child_start[node]-1, -1):
+                stack.append((child, word + ALPHABET[self.labels[child]]))
         return out
 
+    def fuzzy_search(self, word, max_dist, top_n=None):
+        """same as Trie.fuzzy_search
+        """
+        labels, child_start = self.labels, self.child_start
+        def children(node):
+            return [(ALPHABET[labels[child]], child)
+                    for child in range(child_start[node], child_start[node+1])]
+        return _fuzzy_walk(0, word, max_dist, top_n, children,
+                           lambda node: self.end_of_word[node])
+
+    def insert(self, word):
+        self._build(sorted(set(self.search('')) | {word}))
+
+    def delete(self, word):
+        """rebuilds the arrays without word (if it exists)
+        """
+        if self.find(word):
+            self._build([w for w in self.search('') if w != word])
+
+
+def benchmark_tries(num_words=10**5, num_queries=10**5, seed=0):
+    """compares Trie against CompactTrie: build time, memory, and
+    throughput of find
+    """
+    import random
+    import time
+    import tracemalloc
+
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(ALPHABET[:8], k=rng.randint(3, 12))) for _ in range(num_words)]
+    queries = [rng.choice(words) if rng.random() < 0.5 else
+               ''.join(rng.choices(ALPHABET[:8], k=rng.randint(3, 12)))
+               for _ in range(num_queries)]
+
+    for cls in [Trie, CompactTrie]:
+        tracemalloc.start()
+        trie = cls(words)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del trie
+
+        start = time.perf_counter()
+        trie = cls(words)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            trie.find(query)
+        find_time = time.perf_counter() - start
+        print(f'{cls.__name__:<12} build {build_time:6.3f}s  memory {memory / 2**20:8.1f}MB  '
+              f'find {num_queries / find_time:12,.0f} ops/s')
+
+
+if __name__ == '__main__':
+    benchmark_tries()
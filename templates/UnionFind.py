@@ -1,3 +1,11 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
 # basics: pointers are in the form of a list called "parent"
 #         where root node of each component occurs where parent[i] == i
 
@@ -52,3 +60,242 @@ def find(parent, i):
         parent[i] = find(parent, parent[i])
         return parent[i]
 
+
+
+# iterative find: the recursive find above hits the recursion limit on
+# long chains (e.g. before the first compression of a path of length
+# 10^5). Path halving is the iterative alternative to full path
+# compression: while walking up, point every other node at its
+# grandparent. It has the same amortized complexity.
+
+def find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+# Putting it all together in a class: union by size (instead of rank,
+# since sizes are often useful on their own) and path halving, with the
+# parent and size lists stored as arrays of 64-bit ints (much smaller
+# than lists of python ints for large n). We also keep track of the
+# number of components, which goes down by one for every union that
+# merges two components.
+
+class UnionFind:
+    # union_many switches to the vectorized version for this many edges
+    NUMPY_THRESHOLD = 10**5
+
+    def __init__(self, n):
+        self.parent = array('q', range(n))
+        self.size = array('q', [1]) * n
+        self.component_count = n
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, node1, node2):
+        """returns True if node1 and node2 were in different components
+        """
+        leader1 = self.find(node1)
+        leader2 = self.find(node2)
+        if leader1 == leader2:
+            return False
+        if self.size[leader1] < self.size[leader2]:
+            leader1, leader2 = leader2, leader1
+        self.parent[leader2] = leader1
+        self.size[leader1] += self.size[leader2]
+        self.component_count -= 1
+        return True
+
+    def connected(self, node1, node2):
+        return self.find(node1) == self.find(node2)
+
+    def component_size(self, i):
+        return self.size[self.find(i)]
+
+    def union_many(self, edges):
+        """unions every (node1, node2) pair in edges (any iterable, e.g. a
+        generator); edges can also be a numpy array of shape (m, 2)
+        """
+        # only sized inputs can be checked against the threshold without
+        # consuming them, iterators always take the loop below
+        if np is not None and (isinstance(edges, np.ndarray) or
+                               (hasattr(edges, '__len__') and len(edges) >= self.NUMPY_THRESHOLD)):
+            self._union_many_numpy(np.asarray(edges, dtype=np.int64).reshape(-1, 2))
+            return
+        find = self.find
+        parent, size = self.parent, self.size
+        for node1, node2 in edges:
+            leader1 = find(node1)
+            leader2 = find(node2)
+            if leader1 == leader2:
+                continue
+            if size[leader1] < size[leader2]:
+                leader1, leader2 = leader2, leader1
+            parent[leader2] = leader1
+            size[leader1] += size[leader2]
+            self.component_count -= 1
+
+    def _union_many_numpy(self, edges):
+        """vectorized union of all edges at once, in rounds: find the
+        leaders of both ends of every edge by pointer jumping (parent =
+        parent[parent] for all nodes at once, until nothing changes), then
+        for every edge whose leaders differ, hook the larger leader onto
+        the smaller one (always hooking onto a smaller index means no
+        cycles can form). Repeat until every edge is inside one component.
+        This doesn't keep union by size, so sizes are recomputed at the end.
+        """
+        # views on the same memory as self.parent / self.size
+        parent = np.frombuffer(self.parent, dtype=np.int64)
+        size = np.frombuffer(self.size, dtype=np.int64)
+        u, v = edges[:, 0], edges[:, 1]
+        while True:
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent[:] = grandparent
+            leader1, leader2 = parent[u], parent[v]
+            differ = leader1 != leader2
+            if not differ.any():
+                break
+            u, v = u[differ], v[differ]
+            leader1, leader2 = leader1[differ], leader2[differ]
+            np.minimum.at(parent, np.maximum(leader1, leader2), np.minimum(leader1, leader2))
+        is_root = parent == np.arange(len(parent))
+        size[is_root] = np.bincount(parent, minlength=len(parent))[is_root]
+        self.component_count = int(is_root.sum())
+
+
+# Union find with rollback: sometimes we need to undo unions, e.g. when
+# edges can also be deleted. Path compression (or halving) changes parent
+# pointers all over the place during find, which would be hard to undo,
+# so here we only use union by rank: that alone keeps trees at height
+# O(logN), so find is O(logN), and every union changes at most one
+# parent pointer and one rank, which we record on an undo stack.
+
+class RollbackUnionFind:
+    def __init__(self, n):
+        self.parent = array('q', range(n))
+        self.rank = array('q', [0]) * n
+        self.component_count = n
+        # (child leader, parent leader, whether the rank was increased)
+        self.history = []
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    def union(self, node1, node2):
+        leader1 = self.find(node1)
+        leader2 = self.find(node2)
+        if leader1 == leader2:
+            return False
+        if self.rank[leader1] < self.rank[leader2]:
+            leader1, leader2 = leader2, leader1
+        self.parent[leader2] = leader1
+        rank_increased = self.rank[leader1] == self.rank[leader2]
+        if rank_increased:
+            self.rank[leader1] += 1
+        self.history.append((leader2, leader1, rank_increased))
+        self.component_count -= 1
+        return True
+
+    def snapshot(self):
+        return len(self.history)
+
+    def rollback(self, snapshot):
+        """undoes every union since snapshot() returned snapshot
+        """
+        while len(self.history) > snapshot:
+            child, leader, rank_increased = self.history.pop()
+            self.parent[child] = child
+            if rank_increased:
+                self.rank[leader] -= 1
+            self.component_count += 1
+
+
+# Offline dynamic connectivity: given a log of edge insertions and
+# deletions on n nodes, find the number of components after each
+# operation. If we know the whole log in advance, every edge is alive
+# during some intervals of time [added, removed). We put each interval
+# into a segment tree over time, the same way a range update is done
+# in templates/RangeQuery.py (ArraySegmentTree): the interval is split
+# into O(logq) nodes that cover it exactly. Then we walk the tree:
+# entering a node unions all of its edges, at a leaf (a point in time)
+# every alive edge has been applied so we read the component count, and
+# leaving a node rolls its unions back. Each edge is unioned O(logq)
+# times at O(logN) each: O(qlogqlogN) overall.
+
+def dynamic_connectivity(n, operations):
+    """operations is a list of ('add', node1, node2) or
+    ('remove', node1, node2); returns the number of components after
+    each operation. Adding an edge twice gives two copies of it, and
+    remove deletes the most recently added copy
+    """
+    q = len(operations)
+    if q == 0:
+        return []
+    log = max(q-1, 0).bit_length()
+    size = 1 << log
+    tree = [[] for _ in range(2*size)]
+
+    def add_interval(low, high, edge):
+        low += size
+        high += size
+        while low < high:
+            if low & 1:
+                tree[low].append(edge)
+                low += 1
+            if high & 1:
+                high -= 1
+                tree[high].append(edge)
+            low >>= 1
+            high >>= 1
+
+    open_edges = {}
+    for t, (op, node1, node2) in enumerate(operations):
+        edge = (min(node1, node2), max(node1, node2))
+        if op == 'add':
+            open_edges.setdefault(edge, []).append(t)
+        elif op == 'remove':
+            starts = open_edges.get(edge)
+            if starts:
+                add_interval(starts.pop(), t, edge)
+        else:
+            raise ValueError(f'unknown operation {op!r}')
+    for edge, starts in open_edges.items():
+        for start in starts:
+            add_interval(start, q, edge)
+
+    uf = RollbackUnionFind(n)
+    out = [0] * q
+    # explicit stack: (tree node, snapshot to roll back to when leaving,
+    # or None when entering)
+    stack = [(1, None)]
+    while stack:
+        node, snapshot = stack.pop()
+        if snapshot is not None:
+            uf.rollback(snapshot)
+            continue
+        snapshot = uf.snapshot()
+        for node1, node2 in tree[node]:
+            uf.union(node1, node2)
+        stack.append((node, snapshot))
+        if node >= size:
+            if node - size < q:
+                out[node - size] = uf.component_count
+        else:
+            stack.append((2*node+1, None))
+            stack.append((2*node, None))
+    return out